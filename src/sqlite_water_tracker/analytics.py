@@ -0,0 +1,245 @@
+# src/sqlite_water_tracker/analytics.py
+
+import copy
+import json
+import sqlite3
+from datetime import date, timedelta
+
+from sqlite_water_tracker.db import run_transaction
+
+AVERAGE_WINDOWS = (7, 30)
+RECENT_DAYS = max(AVERAGE_WINDOWS)
+
+# Daily totals with that day's target, like water_log_daily_with_weight_and_target,
+# but restricted to days on or after a start date so the timestamp index is used.
+DAILY_ROLLUP_SQL = """
+SELECT
+    date,
+    total,
+    (
+        SELECT weight_lbs
+        FROM user_weight
+        WHERE SUBSTR(timestamp, 1, 10) <= date
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ) / 2 AS target
+FROM
+(
+    SELECT
+        SUBSTR(timestamp, 1, 10) AS date,
+        SUM(ounces) AS total
+    FROM water_log
+    WHERE timestamp >= ?
+    GROUP BY date
+)
+ORDER BY date
+"""
+
+
+def _empty_state(history_version: int) -> dict:
+    return {
+        "last_log_id": 0,
+        "history_version": history_version,
+        "first_date": None,
+        "closed_through": None,
+        "streak": 0,
+        "streak_end": None,
+        "best_streak": 0,
+        "recent_days": {},
+        "hour_ounces": [0.0] * 24,
+        "hour_drinks": [0] * 24,
+    }
+
+
+def _history_version(conn: sqlite3.Connection) -> int:
+    """Counter bumped by triggers whenever already-logged drinks or any weights change."""
+    row = conn.execute("SELECT version FROM history_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def load_state(conn: sqlite3.Connection):
+    """Return the persisted analytics state, or None if there isn't one yet."""
+    cur = conn.execute(
+        """
+        SELECT last_log_id, history_version, first_date,
+               closed_through, streak, streak_end, best_streak,
+               recent_days, hour_ounces, hour_drinks
+        FROM analytics_state
+        WHERE id = 1
+        """
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    columns = [col[0] for col in cur.description]
+    state = dict(zip(columns, row))
+    for key in ("recent_days", "hour_ounces", "hour_drinks"):
+        state[key] = json.loads(state[key])
+    return state
+
+
+def save_state(conn: sqlite3.Connection, state: dict) -> None:
+    """Write the state; the caller commits."""
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO analytics_state (
+            id, last_log_id, history_version, first_date,
+            closed_through, streak, streak_end, best_streak,
+            recent_days, hour_ounces, hour_drinks
+        )
+        VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            state["last_log_id"],
+            state["history_version"],
+            state["first_date"],
+            state["closed_through"],
+            state["streak"],
+            state["streak_end"],
+            state["best_streak"],
+            json.dumps(state["recent_days"]),
+            json.dumps(state["hour_ounces"]),
+            json.dumps(state["hour_drinks"]),
+        ),
+    )
+
+
+def _next_day(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def _fold_day(state: dict, day: str, total: float, target) -> None:
+    """Advance the streak and recent-day totals by one complete day."""
+    met = target is not None and total >= target
+    if met:
+        if state["streak_end"] is not None and _next_day(state["streak_end"]) == day:
+            state["streak"] += 1
+        else:
+            state["streak"] = 1
+        state["streak_end"] = day
+        state["best_streak"] = max(state["best_streak"], state["streak"])
+    state["recent_days"][day] = total
+
+
+def update(conn: sqlite3.Connection, today: date | None = None) -> dict:
+    """Fold new drinks and newly completed days into the saved state.
+
+    Only drinks with an id past the last one seen, and days after the last
+    complete day, are read. If drinks were edited or deleted, weights
+    changed (both tracked by the history_version counter), or a new drink
+    is back-dated into an already-complete day, the state is rebuilt with
+    a single pass over the whole daily rollup.
+
+    Everything is read and saved in one transaction, so a drink logged
+    while the update runs can't be half-counted; it is picked up next time.
+
+    Returns the current analytics as a dict (see summarize()).
+    """
+    today = today or date.today()
+    return run_transaction(conn, lambda conn: _update(conn, today))
+
+
+def _update(conn: sqlite3.Connection, today: date) -> dict:
+    today_str = today.isoformat()
+    yesterday_str = (today - timedelta(days=1)).isoformat()
+
+    history_version = _history_version(conn)
+    saved = load_state(conn)
+    state = copy.deepcopy(saved)
+    if state is None or state["history_version"] != history_version:
+        state = _empty_state(history_version)
+
+    (first_new,) = conn.execute(
+        "SELECT MIN(timestamp) FROM water_log WHERE id > ?", (state["last_log_id"],)
+    ).fetchone()
+    if (
+        first_new is not None
+        and state["closed_through"] is not None
+        and first_new[:10] <= state["closed_through"]
+    ):
+        state = _empty_state(history_version)
+
+    # Hour-of-day histogram from the new drinks
+    cur = conn.execute(
+        "SELECT id, timestamp, ounces FROM water_log WHERE id > ? ORDER BY id",
+        (state["last_log_id"],),
+    )
+    for row_id, timestamp, ounces in cur:
+        hour = int(timestamp[11:13]) if len(timestamp) >= 13 else 0
+        state["hour_ounces"][hour] += ounces
+        state["hour_drinks"][hour] += 1
+        state["last_log_id"] = row_id
+        day = timestamp[:10]
+        if state["first_date"] is None or day < state["first_date"]:
+            state["first_date"] = day
+
+    # Streaks and recent totals from days completed since the last update,
+    # plus today's running total, in one pass over the daily rollup
+    start = _next_day(state["closed_through"]) if state["closed_through"] else ""
+    today_total = 0.0
+    today_target = None
+    for day, total, target in conn.execute(DAILY_ROLLUP_SQL, (start,)):
+        if day < today_str:
+            _fold_day(state, day, total, target)
+        elif day == today_str:
+            today_total, today_target = total, target
+
+    if state["closed_through"] is None or state["closed_through"] < yesterday_str:
+        state["closed_through"] = yesterday_str
+
+    oldest_kept = (today - timedelta(days=RECENT_DAYS)).isoformat()
+    state["recent_days"] = {
+        day: total for day, total in state["recent_days"].items() if day >= oldest_kept
+    }
+
+    # Only write when something changed: a no-op refresh shouldn't take the
+    # write lock or bump data_version (which would invalidate server ETags)
+    if state != saved:
+        save_state(conn, state)
+
+    if today_target is None:
+        row = conn.execute(
+            "SELECT weight_lbs / 2 FROM user_weight ORDER BY timestamp DESC LIMIT 1"
+        ).fetchone()
+        today_target = row[0] if row else None
+
+    return summarize(state, today, today_total, today_target)
+
+
+def summarize(state: dict, today: date, today_total: float, today_target) -> dict:
+    """Turn the running state plus today's live total into reportable numbers.
+
+    Averages cover complete days only (ending yesterday), counting days
+    without drinks as zero, and never reach back before the first drink.
+    """
+    yesterday = today - timedelta(days=1)
+    today_met = today_target is not None and today_total >= today_target
+
+    streak = state["streak"] if state["streak_end"] == yesterday.isoformat() else 0
+    if today_met:
+        streak += 1
+
+    averages = {}
+    for window in AVERAGE_WINDOWS:
+        days = window
+        if state["first_date"] is not None:
+            days = min(days, (today - date.fromisoformat(state["first_date"])).days)
+        if days <= 0:
+            averages[window] = None
+            continue
+        recent = [
+            state["recent_days"].get((yesterday - timedelta(days=i)).isoformat(), 0.0)
+            for i in range(days)
+        ]
+        averages[window] = sum(recent) / days
+
+    return {
+        "current_streak": streak,
+        "best_streak": max(state["best_streak"], streak),
+        "today_total": today_total,
+        "today_target": today_target,
+        "today_met": today_met,
+        "averages": averages,
+        "hour_ounces": list(state["hour_ounces"]),
+        "hour_drinks": list(state["hour_drinks"]),
+    }
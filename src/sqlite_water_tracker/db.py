@@ -0,0 +1,220 @@
+# src/sqlite_water_tracker/db.py
+
+import random
+import sqlite3
+import time
+from pathlib import Path
+
+# How long a connection waits on a lock held by another process before
+# raising "database is locked". The Termux widget and the TUI can both be
+# writing at the same moment, so the SQLite default of 0 is too strict.
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+
+# Checkpoint policy: SQLite folds the WAL back into the main database file
+# once it grows past this many pages (~4 MB with the default page size).
+# A full TRUNCATE checkpoint is done by checkpoint() when the app exits.
+WAL_AUTOCHECKPOINT_PAGES = 1000
+
+# Retry policy for writes that still hit a lock after the busy timeout.
+WRITE_RETRIES = 5
+WRITE_BACKOFF_BASE_S = 0.05
+WRITE_BACKOFF_MAX_S = 1.0
+
+
+def connect(
+    db_path: str,
+    busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+    readonly: bool = False,
+) -> sqlite3.Connection:
+    """Open a connection configured for concurrent readers and writers.
+
+    WAL lets readers and a writer proceed at the same time, and
+    synchronous=NORMAL is durable against application crashes in WAL mode
+    while avoiding an fsync on every commit. A readonly connection skips
+    those settings, since the journal mode can only be changed by a writer
+    and is already persisted in the file by ensure_db().
+    """
+    if readonly:
+        conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True, timeout=busy_timeout_ms / 1000)
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        return conn
+
+    conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT_PAGES}")
+    return conn
+
+
+def is_lock_error(exc: sqlite3.OperationalError) -> bool:
+    """True if the error is a transient lock/busy error worth retrying."""
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def _sleep_before_retry(attempt: int) -> None:
+    """Exponential backoff plus jitter, so competing writers don't wake up in lockstep."""
+    delay = min(WRITE_BACKOFF_MAX_S, WRITE_BACKOFF_BASE_S * (2 ** attempt))
+    time.sleep(delay * (0.5 + random.random()))
+
+
+def run_write(conn: sqlite3.Connection, sql: str, params=(), retries: int = WRITE_RETRIES) -> int:
+    """Execute a single write statement and commit, retrying on lock errors.
+
+    Returns the cursor's rowcount.
+    """
+    attempt = 0
+    while True:
+        try:
+            cur = conn.execute(sql, params)
+            conn.commit()
+            return cur.rowcount
+        except sqlite3.OperationalError as exc:
+            conn.rollback()
+            if not is_lock_error(exc) or attempt >= retries:
+                raise
+            _sleep_before_retry(attempt)
+            attempt += 1
+
+
+def run_transaction(conn: sqlite3.Connection, work, retries: int = WRITE_RETRIES):
+    """Call work(conn) inside one transaction and commit, retrying on lock errors.
+
+    All of work's reads see the same snapshot. If it writes after another
+    connection has committed, SQLite refuses the write instead of waiting,
+    so the whole transaction is rolled back and work runs again on a fresh
+    snapshot. Returns whatever work returns.
+    """
+    attempt = 0
+    while True:
+        try:
+            conn.execute("BEGIN")
+            result = work(conn)
+            conn.commit()
+            return result
+        except sqlite3.OperationalError as exc:
+            conn.rollback()
+            if not is_lock_error(exc) or attempt >= retries:
+                raise
+            _sleep_before_retry(attempt)
+            attempt += 1
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def checkpoint(db_path: str, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS) -> None:
+    """Copy the WAL back into the database file and truncate it.
+
+    Safe to call while other processes are connected; if a reader is still
+    using the WAL the checkpoint is partial and SQLite finishes it later.
+    """
+    conn = connect(db_path, busy_timeout_ms)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+# --- Rolling windows ---------------------------------------------------
+#
+# water_log.cumulative_ounces is a running total ordered by (timestamp, id),
+# so the ounces in (T - N hours, T] are the running total at T minus the
+# running total at T - N hours: two lookups on the timestamp index, for any N.
+
+ROLLING_COLUMNS = ("timestamp", "ounces", "rolling_ounces", "weight", "target", "percent_of_target")
+SUMMARY_COLUMNS = ("total_ounces", "weight", "target_ounces", "percent_of_target")
+
+
+def rolling(conn: sqlite3.Connection, hours: float = 24, limit: int = 20) -> list:
+    """Latest entries with their rolling N-hour totals, newest first.
+
+    Rows are (timestamp, ounces, rolling_ounces, weight, target, percent_of_target).
+    """
+    cur = conn.execute(
+        """
+        SELECT timestamp,
+               ounces,
+               rolling_ounces,
+               weight,
+               weight / 2 AS target,
+               ROUND(rolling_ounces * 100.0 / (weight / 2), 2) AS percent_of_target
+        FROM
+        (
+            SELECT
+                w1.timestamp,
+                w1.ounces,
+                ROUND(
+                    (
+                        SELECT w2.cumulative_ounces
+                        FROM water_log AS w2
+                        WHERE w2.timestamp <= w1.timestamp
+                        ORDER BY w2.timestamp DESC, w2.id DESC
+                        LIMIT 1
+                    )
+                    - COALESCE(
+                        (
+                            SELECT w2.cumulative_ounces
+                            FROM water_log AS w2
+                            WHERE w2.timestamp <= datetime(w1.timestamp, ?)
+                            ORDER BY w2.timestamp DESC, w2.id DESC
+                            LIMIT 1
+                        ),
+                        0
+                    ),
+                    2
+                ) AS rolling_ounces,
+                (
+                    SELECT weight_lbs
+                    FROM user_weight
+                    WHERE timestamp <= w1.timestamp
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                ) AS weight
+            FROM water_log AS w1
+            ORDER BY w1.timestamp DESC, w1.id DESC
+            LIMIT ?
+        )
+        """,
+        (f"-{hours} hours", limit),
+    )
+    return cur.fetchall()
+
+
+def window_summary(conn: sqlite3.Connection, hours: float = 24):
+    """Single row of (total_ounces, weight, target_ounces, percent_of_target) for the last N hours."""
+    cur = conn.execute(
+        """
+        SELECT total,
+               weight,
+               weight / 2 AS target_ounces,
+               ROUND(total * 100.0 / (weight / 2), 2) AS percent_of_target
+        FROM
+        (
+            SELECT
+                ROUND(
+                    (
+                        SELECT cumulative_ounces
+                        FROM water_log
+                        ORDER BY timestamp DESC, id DESC
+                        LIMIT 1
+                    )
+                    - COALESCE(
+                        (
+                            SELECT cumulative_ounces
+                            FROM water_log
+                            WHERE timestamp < datetime('now', ?, 'localtime')
+                            ORDER BY timestamp DESC, id DESC
+                            LIMIT 1
+                        ),
+                        0
+                    ),
+                    2
+                ) AS total,
+                (SELECT weight_lbs FROM user_weight ORDER BY timestamp DESC LIMIT 1) AS weight
+        )
+        """,
+        (f"-{hours} hours",),
+    )
+    return cur.fetchone()
@@ -1,16 +1,45 @@
 # src/sqlite_water_tracker/ensure_db.py
 
+import re
 import sqlite3
 from importlib.resources import files
 
+from sqlite_water_tracker.db import connect, DEFAULT_BUSY_TIMEOUT_MS
+
 DEFAULT_WEIGHT_LBS = 160.0
 
+# Stored in PRAGMA user_version once schema.sql has been applied. Bump it
+# whenever schema.sql changes so existing DBs pick the change up.
+SCHEMA_VERSION = 1
+
+# Views and triggers declared in schema.sql, dropped before an upgrade
+_SCHEMA_OBJECT_RE = re.compile(
+    r"^CREATE\s+(VIEW|TRIGGER)\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
 
 def load_schema_text() -> str:
     """Load schema.sql from the installed sqlite_water_tracker package."""
     return (files("sqlite_water_tracker") / "schema.sql").read_text(encoding="utf-8")
 
 
+def schema_statements(schema_sql: str) -> list[str]:
+    """Split schema.sql into single statements.
+
+    executescript() commits before it runs, so the schema is executed one
+    statement at a time to keep it inside the caller's transaction.
+    """
+    statements = []
+    pending = ""
+    for line in schema_sql.splitlines(keepends=True):
+        pending += line
+        if sqlite3.complete_statement(pending):
+            statements.append(pending.strip())
+            pending = ""
+    return statements
+
+
 def seed_default_weight(conn: sqlite3.Connection, default_weight: float = DEFAULT_WEIGHT_LBS) -> None:
     """Insert a default weight row if none exist."""
     cur = conn.cursor()
@@ -26,16 +55,61 @@ def seed_default_weight(conn: sqlite3.Connection, default_weight: float = DEFAUL
         """,
         (default_weight,),
     )
-    conn.commit()
 
 
-def ensure_db(db_path: str) -> None:
-    """Create the SQLite database schema if needed, otherwise leave it alone."""
-    conn = sqlite3.connect(db_path)
+def migrate_cumulative_ounces(conn: sqlite3.Connection) -> None:
+    """Add and backfill water_log.cumulative_ounces on DBs created before it existed."""
+    cur = conn.cursor()
+    cur.execute("PRAGMA table_info(water_log)")
+    columns = [row[1] for row in cur.fetchall()]
+    if "cumulative_ounces" in columns:
+        return
+
+    cur.execute("ALTER TABLE water_log ADD COLUMN cumulative_ounces REAL NOT NULL DEFAULT 0")
+    cur.execute(
+        """
+        UPDATE water_log
+        SET cumulative_ounces = running.total
+        FROM (
+            SELECT id, SUM(ounces) OVER (ORDER BY timestamp, id) AS total
+            FROM water_log
+        ) AS running
+        WHERE running.id = water_log.id
+        """
+    )
+
+
+def migrate_analytics_state(conn: sqlite3.Connection) -> None:
+    """Drop an analytics_state table in an older layout.
+
+    It only caches results that analytics.update() can rebuild, so the
+    schema simply recreates it and the next update starts from scratch.
+    """
+    cur = conn.cursor()
+    cur.execute("PRAGMA table_info(analytics_state)")
+    columns = [row[1] for row in cur.fetchall()]
+    if columns and "history_version" not in columns:
+        cur.execute("DROP TABLE analytics_state")
+
+
+def apply_schema(conn: sqlite3.Connection) -> None:
+    """Bring the DB up to SCHEMA_VERSION in a single write transaction.
+
+    Readers keep seeing the old schema until the commit, and writers wait
+    on the lock instead of slipping in between a trigger being dropped and
+    recreated. Views and triggers from schema.sql are dropped first so
+    their CREATE ... IF NOT EXISTS installs the current definitions.
+    """
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
     try:
-        cur = conn.cursor()
+        # Another process may have upgraded the DB while we waited for the lock
+        cur.execute("PRAGMA user_version")
+        if cur.fetchone()[0] >= SCHEMA_VERSION:
+            conn.rollback()
+            return
 
-        # Is the main table already there?
+        statements = schema_statements(load_schema_text())
         cur.execute(
             """
             SELECT name
@@ -43,29 +117,45 @@ def ensure_db(db_path: str) -> None:
             WHERE type = 'table' AND name = 'water_log'
             """
         )
-        has_water_log = cur.fetchone() is not None
-
-        if not has_water_log:
-            # New or uninitialized DB: apply full schema
-            schema_sql = load_schema_text()
-            conn.executescript(schema_sql)
-            # After schema is in place, seed default weight
-            seed_default_weight(conn)
-            conn.commit()
-            return
+        if cur.fetchone() is not None:
+            # Existing DB: replace our views and triggers, upgrade older tables
+            for statement in statements:
+                match = _SCHEMA_OBJECT_RE.search(statement)
+                if match:
+                    kind, name = match.groups()
+                    cur.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+            migrate_cumulative_ounces(conn)
+            migrate_analytics_state(conn)
 
-        # DB already initialized. Optionally ensure weight is seeded
-        cur.execute(
-            """
-            SELECT name
-            FROM sqlite_master
-            WHERE type = 'table' AND name = 'user_weight'
-            """
-        )
-        has_user_weight = cur.fetchone() is not None
-        if has_user_weight:
-            seed_default_weight(conn)
+        for statement in statements:
+            cur.execute(statement)
+        seed_default_weight(conn)
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def ensure_db(db_path: str, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS) -> None:
+    """Create or upgrade the SQLite database schema if needed.
+
+    A DB already at SCHEMA_VERSION is left alone apart from seeding a
+    default weight, so starting the app doesn't touch the schema while
+    other processes are using it.
+
+    Opening through connect() also switches the file to WAL mode, which is
+    persistent, so other tools opening the DB afterwards get it too.
+    """
+    conn = connect(db_path, busy_timeout_ms)
+    try:
+        cur = conn.cursor()
+        cur.execute("PRAGMA user_version")
+        if cur.fetchone()[0] < SCHEMA_VERSION:
+            apply_schema(conn)
+            return
 
+        seed_default_weight(conn)
         conn.commit()
     finally:
         conn.close()
@@ -1,10 +1,79 @@
+-- Applied by ensure_db() in a single transaction whenever the DB's
+-- PRAGMA user_version is below ensure_db.SCHEMA_VERSION. Bump SCHEMA_VERSION
+-- when changing this file; on upgrade the views and triggers named here are
+-- dropped first, so their CREATE ... IF NOT EXISTS picks up new definitions.
+
 
 CREATE TABLE IF NOT EXISTS water_log (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp TEXT NOT NULL,
-    ounces REAL NOT NULL
+    ounces REAL NOT NULL,
+    -- Running total of ounces over all rows up to and including this one,
+    -- ordered by (timestamp, id). Maintained by the triggers below.
+    cumulative_ounces REAL NOT NULL DEFAULT 0
 );
 
+-- Also serves ORDER BY timestamp, id lookups: the rowid is the last index column
+CREATE INDEX IF NOT EXISTS water_log_timestamp_idx ON water_log (timestamp);
+
+-- Keep cumulative_ounces correct. Appending a drink only touches the new row;
+-- back-dated inserts, deletes and edits also shift every later row.
+CREATE TRIGGER IF NOT EXISTS water_log_cumulative_insert
+AFTER INSERT ON water_log
+BEGIN
+    UPDATE water_log
+    SET cumulative_ounces = NEW.ounces + COALESCE(
+        (
+            SELECT cumulative_ounces
+            FROM water_log
+            WHERE (timestamp, id) < (NEW.timestamp, NEW.id)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        ),
+        0
+    )
+    WHERE id = NEW.id;
+
+    UPDATE water_log
+    SET cumulative_ounces = cumulative_ounces + NEW.ounces
+    WHERE (timestamp, id) > (NEW.timestamp, NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS water_log_cumulative_delete
+AFTER DELETE ON water_log
+BEGIN
+    UPDATE water_log
+    SET cumulative_ounces = cumulative_ounces - OLD.ounces
+    WHERE (timestamp, id) > (OLD.timestamp, OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS water_log_cumulative_update
+AFTER UPDATE OF timestamp, ounces ON water_log
+BEGIN
+    -- Take the old row out of everything after its old position...
+    UPDATE water_log
+    SET cumulative_ounces = cumulative_ounces - OLD.ounces
+    WHERE (timestamp, id) > (OLD.timestamp, OLD.id) AND id != NEW.id;
+
+    -- ...then put it back in at its new position, as for an insert
+    UPDATE water_log
+    SET cumulative_ounces = NEW.ounces + COALESCE(
+        (
+            SELECT cumulative_ounces
+            FROM water_log
+            WHERE (timestamp, id) < (NEW.timestamp, NEW.id)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        ),
+        0
+    )
+    WHERE id = NEW.id;
+
+    UPDATE water_log
+    SET cumulative_ounces = cumulative_ounces + NEW.ounces
+    WHERE (timestamp, id) > (NEW.timestamp, NEW.id);
+END;
+
 CREATE TABLE IF NOT EXISTS user_weight (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     timestamp TEXT NOT NULL, 
@@ -12,6 +81,63 @@ CREATE TABLE IF NOT EXISTS user_weight (
 );
 -- ----------------------------------------------------------------------
 
+-- Bumped whenever existing history changes: a drink is edited or deleted, or
+-- any weight row is added, edited or deleted. New drinks don't bump it, since
+-- analytics.py folds those in incrementally.
+CREATE TABLE IF NOT EXISTS history_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO history_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS water_log_history_update
+AFTER UPDATE OF timestamp, ounces ON water_log
+BEGIN
+    UPDATE history_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS water_log_history_delete
+AFTER DELETE ON water_log
+BEGIN
+    UPDATE history_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_weight_history_insert
+AFTER INSERT ON user_weight
+BEGIN
+    UPDATE history_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_weight_history_update
+AFTER UPDATE ON user_weight
+BEGIN
+    UPDATE history_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_weight_history_delete
+AFTER DELETE ON user_weight
+BEGIN
+    UPDATE history_version SET version = version + 1 WHERE id = 1;
+END;
+
+-- Running state for analytics.py, so streaks, averages and the hour-of-day
+-- histogram can be updated from new drinks instead of rescanning water_log.
+CREATE TABLE IF NOT EXISTS analytics_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_log_id INTEGER NOT NULL,      -- highest water_log.id folded in
+    history_version INTEGER NOT NULL,  -- history_version.version the state was built from
+    first_date TEXT,                -- earliest day with a drink
+    closed_through TEXT,            -- last complete day folded into the streaks
+    streak INTEGER NOT NULL,        -- consecutive days meeting target ending at streak_end
+    streak_end TEXT,
+    best_streak INTEGER NOT NULL,
+    recent_days TEXT NOT NULL,      -- JSON {date: total} for the last 30 complete days
+    hour_ounces TEXT NOT NULL,      -- JSON list of 24 ounce totals by hour of day
+    hour_drinks TEXT NOT NULL       -- JSON list of 24 drink counts by hour of day
+);
+
+-- ----------------------------------------------------------------------
+
 -- CREATE TABLE IF NOT EXISTS user_settings (
 --     id INTEGER PRIMARY KEY AUTOINCREMENT,
 --     weight_unit TEXT NOT NULL DEFAULT 'lbs' CHECK (weight_unit IN ('lbs', 'kg')),
@@ -20,16 +146,14 @@ CREATE TABLE IF NOT EXISTS user_weight (
 
 -- ----------------------------------------------------------------------
 
-DROP VIEW IF EXISTS water_log_daily;
-CREATE VIEW water_log_daily AS
+CREATE VIEW IF NOT EXISTS water_log_daily AS
 SELECT
     SUBSTR(timestamp, 1, 10) AS date,
     SUM(ounces) AS total
 FROM water_log
 GROUP BY date;
 
-DROP VIEW IF EXISTS water_log_daily_with_weight;
-CREATE VIEW water_log_daily_with_weight AS
+CREATE VIEW IF NOT EXISTS water_log_daily_with_weight AS
 SELECT
     date,
     total,
@@ -42,8 +166,7 @@ SELECT
     ) AS weight
 FROM water_log_daily;
 
-DROP VIEW IF EXISTS water_log_daily_with_weight_and_target;
-CREATE VIEW water_log_daily_with_weight_and_target AS
+CREATE VIEW IF NOT EXISTS water_log_daily_with_weight_and_target AS
 SELECT
     date,
     total,
@@ -52,8 +175,7 @@ SELECT
 FROM water_log_daily_with_weight
 ORDER BY date;
 
-DROP VIEW IF EXISTS water_log_daily_with_weight_target_percent;
-CREATE VIEW water_log_daily_with_weight_target_percent AS
+CREATE VIEW IF NOT EXISTS water_log_daily_with_weight_target_percent AS
 SELECT
     date,
     total,
@@ -62,8 +184,7 @@ SELECT
     ROUND(total * 100.0 / target, 2) AS percent_of_target
 FROM water_log_daily_with_weight_and_target;
 
-DROP VIEW IF EXISTS water_log_full;
-CREATE VIEW water_log_full AS
+CREATE VIEW IF NOT EXISTS water_log_full AS
 SELECT
     date,
     total,
@@ -73,7 +194,8 @@ SELECT
 FROM water_log_daily_with_weight_target_percent
 ORDER BY date;
 -- ----------------------------------------------------------------------
-DROP VIEW IF EXISTS last_24_hours_summary;
+-- The 24h views below are kept for direct SQL use. The app and the server go
+-- through db.rolling() / db.window_summary(), which take any window size.
 CREATE VIEW IF NOT EXISTS last_24_hours_summary AS
 SELECT
     *,
@@ -86,29 +208,45 @@ FROM
     FROM
     (
         SELECT 
-            (SELECT SUM(ounces) FROM water_log WHERE timestamp >= datetime('now', '-1 day', 'localtime')) AS total_ounces_last_24_hours,
+            ROUND(
+                (SELECT cumulative_ounces FROM water_log ORDER BY timestamp DESC, id DESC LIMIT 1)
+                - COALESCE((SELECT cumulative_ounces FROM water_log WHERE timestamp < datetime('now', '-1 day', 'localtime') ORDER BY timestamp DESC, id DESC LIMIT 1), 0),
+                2
+            ) AS total_ounces_last_24_hours,
             (SELECT weight_lbs FROM user_weight ORDER BY timestamp DESC LIMIT 1)                          AS weight
     )    
 );
 -- ----------------------------------------------------------------------
-DROP VIEW IF EXISTS rolling_24_hour_summary;
-CREATE VIEW rolling_24_hour_summary AS
+CREATE VIEW IF NOT EXISTS rolling_24_hour_summary AS
 SELECT
     w1.id,
     w1.timestamp,
     w1.ounces,
-    (
-        SELECT SUM(w2.ounces)
-        FROM water_log AS w2
-        WHERE
-            w2.timestamp > datetime(w1.timestamp, '-24 hours')
-            AND w2.timestamp <= w1.timestamp
+    -- Sum over (timestamp - 24h, timestamp] as a difference of two running totals
+    ROUND(
+        (
+            SELECT w2.cumulative_ounces
+            FROM water_log AS w2
+            WHERE w2.timestamp <= w1.timestamp
+            ORDER BY w2.timestamp DESC, w2.id DESC
+            LIMIT 1
+        )
+        - COALESCE(
+            (
+                SELECT w2.cumulative_ounces
+                FROM water_log AS w2
+                WHERE w2.timestamp <= datetime(w1.timestamp, '-24 hours')
+                ORDER BY w2.timestamp DESC, w2.id DESC
+                LIMIT 1
+            ),
+            0
+        ),
+        2
     ) AS rolling_24h_ounces
 FROM water_log AS w1
 ORDER BY w1.timestamp;
 
-DROP VIEW IF EXISTS rolling_24_hour_summary_with_weight;
-CREATE VIEW rolling_24_hour_summary_with_weight AS
+CREATE VIEW IF NOT EXISTS rolling_24_hour_summary_with_weight AS
 SELECT
     id,
     timestamp,
@@ -123,8 +261,7 @@ SELECT
     ) AS weight
 FROM rolling_24_hour_summary AS r;
 
-DROP VIEW IF EXISTS rolling_24_hour_summary_with_weight_and_target;
-CREATE VIEW rolling_24_hour_summary_with_weight_and_target AS
+CREATE VIEW IF NOT EXISTS rolling_24_hour_summary_with_weight_and_target AS
 SELECT
     id,
     timestamp,
@@ -135,8 +272,7 @@ SELECT
 FROM rolling_24_hour_summary_with_weight
 ORDER BY timestamp;
 
-DROP VIEW IF EXISTS rolling_24_hour_summary_with_weight_target_percent;
-CREATE VIEW rolling_24_hour_summary_with_weight_target_percent AS
+CREATE VIEW IF NOT EXISTS rolling_24_hour_summary_with_weight_target_percent AS
 SELECT
     id,
     timestamp,
@@ -148,8 +284,7 @@ SELECT
 FROM rolling_24_hour_summary_with_weight_and_target
 ORDER BY timestamp;
 
-DROP VIEW IF EXISTS rolling_log_full;
-CREATE VIEW rolling_log_full AS
+CREATE VIEW IF NOT EXISTS rolling_log_full AS
 SELECT
     timestamp,
     ounces,
@@ -0,0 +1,288 @@
+# src/sqlite_water_tracker/server.py
+
+import asyncio
+import json
+import secrets
+import sqlite3
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from sqlite_water_tracker.ensure_db import ensure_db
+from sqlite_water_tracker.db import (
+    connect,
+    rolling,
+    window_summary,
+    ROLLING_COLUMNS,
+    SUMMARY_COLUMNS,
+    DEFAULT_BUSY_TIMEOUT_MS,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8024
+
+DAILY_COLUMNS = ("date", "total", "weight", "target", "percent_of_target")
+
+
+def fetch_summary(conn, limit: int, hours: float):
+    row = window_summary(conn, hours)
+    if row is None:
+        return None
+    return {"hours": hours, **dict(zip(SUMMARY_COLUMNS, row))}
+
+
+def fetch_daily(conn, limit: int, hours: float):
+    cur = conn.execute(
+        """
+        SELECT date, total, weight, target, percent_of_target
+        FROM water_log_full
+        ORDER BY date DESC
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    return [dict(zip(DAILY_COLUMNS, row)) for row in cur.fetchall()]
+
+
+def fetch_rolling(conn, limit: int, hours: float):
+    return [dict(zip(ROLLING_COLUMNS, row)) for row in rolling(conn, hours, limit)]
+
+
+# path -> (fetch function, uses ?limit, uses ?hours)
+ENDPOINTS = {
+    "/summary": (fetch_summary, False, True),
+    "/daily": (fetch_daily, True, False),
+    "/rolling": (fetch_rolling, True, True),
+}
+
+# Endpoints whose result depends on the current time as well as the data,
+# and how many seconds their ETag stays valid while the data is unchanged
+TIME_DEPENDENT = {"/summary": 60}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+
+# Rolling window size for /summary and /rolling, overridable with ?hours=N
+DEFAULT_HOURS = 24
+MAX_HOURS = 24 * 366
+
+# Upper bound on cached response bodies; the least recently used is evicted first
+MAX_CACHE_ENTRIES = 32
+
+# A client must send its full request head within this many seconds
+REQUEST_TIMEOUT_S = 10
+MAX_HEADERS = 100
+
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    500: "Internal Server Error",
+}
+
+
+class WaterServer:
+    """Read-only JSON API over the water tracker data.
+
+    All requests share one read-only connection. Responses carry an ETag
+    built from PRAGMA data_version, which only changes when another
+    connection commits, so pollers sending If-None-Match get a 304 without
+    anything being queried. The summary is relative to "now", so its ETag
+    also rolls over once a minute.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.conn = connect(db_path, busy_timeout_ms, readonly=True)
+
+        # data_version restarts with each connection, so tag ETags with
+        # something unique to this server instance
+        self.instance = secrets.token_hex(4)
+
+        # (path, limit, hours) -> (etag, encoded JSON body), valid for self.cached_version
+        self.cache = {}
+        self.cached_version = None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # --- Data -----------------------------------------------------------
+
+    def data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def etag(self, path: str, version: int) -> str:
+        tag = f"{self.instance}-{version}"
+        if path in TIME_DEPENDENT:
+            tag += f"-{int(time.time() // TIME_DEPENDENT[path])}"
+        return f'"{tag}"'
+
+    def query(self, path: str, limit: int, hours: float) -> bytes:
+        """Run the endpoint's query and encode the result as JSON."""
+        fetch, _uses_limit, _uses_hours = ENDPOINTS[path]
+        return json.dumps(fetch(self.conn, limit, hours)).encode("utf-8")
+
+    def body_for(self, path: str, limit: int, hours: float, version: int, etag: str) -> bytes:
+        """Return the response body, reusing the cached one while its ETag is current."""
+        if version != self.cached_version:
+            self.cache.clear()
+            self.cached_version = version
+
+        _fetch, uses_limit, uses_hours = ENDPOINTS[path]
+        key = (path, limit if uses_limit else None, hours if uses_hours else None)
+        # Pop and re-insert so dict order tracks recency for eviction
+        cached = self.cache.pop(key, None)
+        if cached is not None and cached[0] == etag:
+            self.cache[key] = cached
+            return cached[1]
+
+        body = self.query(path, limit, hours)
+        self.cache[key] = (etag, body)
+        while len(self.cache) > MAX_CACHE_ENTRIES:
+            self.cache.pop(next(iter(self.cache)))
+        return body
+
+    # --- HTTP -----------------------------------------------------------
+
+    async def read_request(self, reader: asyncio.StreamReader):
+        """Read the request line and headers.
+
+        Returns (request_line, headers). Raises ValueError for an over-long
+        line or too many headers.
+        """
+        request_line = await reader.readline()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise ValueError("too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return request_line, headers
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve a single HTTP/1.1 request, then close the connection."""
+        try:
+            try:
+                request_line, headers = await asyncio.wait_for(
+                    self.read_request(reader), REQUEST_TIMEOUT_S
+                )
+            except TimeoutError:
+                self.respond(writer, 408)
+                return
+            except ValueError:
+                # StreamReader.readline() raises ValueError for lines over its limit
+                self.respond(writer, 400)
+                return
+
+            try:
+                self.dispatch(writer, request_line, headers)
+            except sqlite3.Error as exc:
+                print(f"sqlite error serving {request_line!r}: {exc}", file=sys.stderr)
+                self.respond(writer, 500)
+        finally:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass  # client went away
+            finally:
+                writer.close()
+
+    def dispatch(self, writer: asyncio.StreamWriter, request_line: bytes, headers: dict) -> None:
+        """Route a parsed request and write the response."""
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            self.respond(writer, 400)
+            return
+        method, target, _version = parts
+
+        if method not in ("GET", "HEAD"):
+            self.respond(writer, 405, extra_headers={"Allow": "GET, HEAD"})
+            return
+
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        if path not in ENDPOINTS:
+            self.respond(writer, 404)
+            return
+
+        params = parse_qs(url.query)
+        try:
+            limit = int(params.get("limit", [DEFAULT_LIMIT])[0])
+            hours = float(params.get("hours", [DEFAULT_HOURS])[0])
+        except ValueError:
+            self.respond(writer, 400)
+            return
+        if not 0 < hours <= MAX_HOURS:
+            self.respond(writer, 400)
+            return
+        limit = max(1, min(limit, MAX_LIMIT))
+        if hours.is_integer():
+            hours = int(hours)
+
+        version = self.data_version()
+        etag = self.etag(path, version)
+        if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+            self.respond(writer, 304, extra_headers={"ETag": etag})
+            return
+
+        body = self.body_for(path, limit, hours, version, etag)
+        self.respond(
+            writer,
+            200,
+            body=body,
+            extra_headers={"ETag": etag, "Content-Type": "application/json"},
+            head_only=method == "HEAD",
+        )
+
+    def respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: bytes = b"",
+        extra_headers=None,
+        head_only: bool = False,
+    ) -> None:
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        headers = {
+            "Cache-Control": "no-cache",
+            "Connection": "close",
+        }
+        if status != 304:
+            headers["Content-Length"] = str(len(body))
+        headers.update(extra_headers or {})
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body and not head_only and status != 304:
+            writer.write(body)
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.Server:
+        """Start listening. Pass port=0 to bind a free port (handy in tests)."""
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(db_path: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """Run the API until cancelled."""
+    app = WaterServer(db_path)
+    server = await app.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "sqlite-water-tracker.db"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+    ensure_db(db_path)
+    print(f"Serving {db_path} on http://{DEFAULT_HOST}:{port}/ (summary, daily, rolling)")
+    try:
+        asyncio.run(serve(db_path, DEFAULT_HOST, port))
+    except KeyboardInterrupt:
+        pass
@@ -1,7 +1,6 @@
 # water_log_tui.py
 
 import sys
-import sqlite3
 
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal, VerticalScroll
@@ -10,10 +9,19 @@ from textual.widgets import DataTable, Header, Footer, Button, Static
 from textual_plotext import PlotextPlot  # <--- NEW
 
 from sqlite_water_tracker.ensure_db import ensure_db, DEFAULT_WEIGHT_LBS  # noqa: E402
+from sqlite_water_tracker.db import (
+    connect,
+    run_write,
+    checkpoint,
+    rolling,
+    window_summary,
+    DEFAULT_BUSY_TIMEOUT_MS,
+)
+from sqlite_water_tracker import analytics
 
 
 class WaterLogApp(App):
-    """TUI to show latest water entries, daily totals, and rolling 24h stats."""
+    """TUI to show latest water entries, daily totals, and rolling window stats."""
 
     CSS = """
     Screen {
@@ -42,13 +50,22 @@ class WaterLogApp(App):
         ("r", "reload", "Reload"),
         ("1", "drink_water", "Drink Water"),
         ("2", "next_view", "Next View"),
+        ("3", "next_window", "Window"),
     ]
 
-    def __init__(self, db_path: str, **kwargs):
+    # Rolling window sizes (hours) cycled by the window button
+    WINDOW_HOURS = (6, 24, 72)
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS, **kwargs):
         super().__init__(**kwargs)
         self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+
+        # Rolling window used by the rolling table, chart and summary card
+        self.window_hours = 24
 
-        # 0 = rolling table, 1 = log table, 2 = full table, 3 = rolling chart
+        # 0 = rolling table, 1 = log table, 2 = full table, 3 = rolling chart,
+        # 4 = analytics
         self.current_view = 0
 
         self.log_table = DataTable(zebra_stripes=True, id="log-table")
@@ -59,14 +76,18 @@ class WaterLogApp(App):
         self.log_table.cursor_type = "row"
         self.log_table.styles.height = 20
 
-        # Plotext-based chart for the rolling 24h view
+        # Plotext-based chart for the rolling window view
         self.rolling_plot = PlotextPlot(id="rolling-plot")
         self.rolling_plot.styles.height = 30  # tweak as desired
 
-        # Summary "card" for last 24h info
+        # Summary "card" for the rolling window
         self.summary_view = Static(id="summary-view")
         self.summary_view.styles.height = 5  # small card-like block
 
+        # Streaks, averages and hour-of-day histogram
+        self.analytics_view = Static(id="analytics-view")
+        self.analytics_view.styles.height = "auto"
+
     def compose(self) -> ComposeResult:
         # Clock off
         yield Header(show_clock=False)
@@ -76,12 +97,13 @@ class WaterLogApp(App):
             yield self.summary_view
 
             # One title, updated when rotating views
-            yield Static("Rolling 24h", classes="section-title", id="section-title")
+            yield Static(f"Rolling {self.window_hours}h", classes="section-title", id="section-title")
 
             yield self.rolling_table
             yield self.log_table
             yield self.full_table
             yield self.rolling_plot
+            yield self.analytics_view
             
             yield Button("Del", id="delete-row-btn")
 
@@ -91,6 +113,7 @@ class WaterLogApp(App):
             yield Button("next", id="rotate-view-btn")
             # yield Button("Delete Selected", id="delete-row-btn")
             yield Button("Drink Water", id="drink-water-btn")
+            yield Button(f"{self.window_hours}h", id="window-btn")
             # yield Button("Del", id="delete-row-btn")
 
         yield Footer()
@@ -117,24 +140,35 @@ class WaterLogApp(App):
         """Cycle to the next view."""
         self._show_view(self.current_view + 1)
 
+    def action_next_window(self) -> None:
+        """Cycle the rolling window size."""
+        sizes = self.WINDOW_HOURS
+        index = sizes.index(self.window_hours) if self.window_hours in sizes else -1
+        self.window_hours = sizes[(index + 1) % len(sizes)]
+        self.query_one("#window-btn", Button).label = f"{self.window_hours}h"
+
+        self.refresh_rolling_table()
+        self.refresh_rolling_plot()
+        self.refresh_summary_view()
+        self._show_view(self.current_view)
+
     # --- DB helpers -----------------------------------------------------
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return connect(self.db_path, self.busy_timeout_ms)
 
     def insert_drink(self, ounces: float = 8.0) -> None:
         """Insert a new drink entry into water_log."""
         conn = self._connect()
         try:
-            cur = conn.cursor()
-            cur.execute(
+            run_write(
+                conn,
                 """
                 INSERT INTO water_log (timestamp, ounces)
                 VALUES (datetime('now', 'localtime'), ?)
                 """,
                 (ounces,),
             )
-            conn.commit()
         finally:
             conn.close()
 
@@ -172,44 +206,31 @@ class WaterLogApp(App):
         finally:
             conn.close()
 
+    def rolling(self, hours: float = 24, limit: int = 20):
+        """Latest entries with their rolling N-hour totals (see db.rolling)."""
+        conn = self._connect()
+        try:
+            return rolling(conn, hours, limit)
+        finally:
+            conn.close()
+
     def fetch_rolling_rows(self):
-        """Latest rolling 24h rows from rolling_log_full."""
+        """Latest rolling rows for the current window size."""
+        return self.rolling(hours=self.window_hours)
+
+    def fetch_analytics(self):
+        """Update the incremental analytics state and return the results."""
         conn = self._connect()
         try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT timestamp,
-                       ounces,
-                       rolling_24h_ounces,
-                       weight,
-                       target,
-                       percent_of_target
-                FROM rolling_log_full
-                ORDER BY timestamp DESC
-                LIMIT 20
-                """
-            )
-            return cur.fetchall()
+            return analytics.update(conn)
         finally:
             conn.close()
 
-    def fetch_last_24h_summary(self):
-        """Fetch single-row summary from last_24_hours_summary view."""
+    def fetch_window_summary(self, hours: float = 24):
+        """Fetch (total, weight, target, percent) for the last N hours."""
         conn = self._connect()
         try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT total_ounces_last_24_hours,
-                       weight,
-                       target_ounces,
-                       percent_of_target
-                FROM last_24_hours_summary
-                LIMIT 1
-                """
-            )
-            return cur.fetchone()
+            return window_summary(conn, hours)
         finally:
             conn.close()
 
@@ -238,9 +259,7 @@ class WaterLogApp(App):
         # Delete from DB
         conn = self._connect()
         try:
-            cur = conn.cursor()
-            cur.execute("DELETE FROM water_log WHERE id = ?", (row_id,))
-            conn.commit()
+            run_write(conn, "DELETE FROM water_log WHERE id = ?", (row_id,))
         finally:
             conn.close()
 
@@ -249,6 +268,7 @@ class WaterLogApp(App):
         self.refresh_rolling_table()
         self.refresh_rolling_plot()
         self.refresh_summary_view()
+        self.refresh_analytics_view()
 
         # Stay in the same view
         self._show_view(self.current_view)
@@ -263,6 +283,7 @@ class WaterLogApp(App):
         self.refresh_rolling_table()
         self.refresh_rolling_plot()
         self.refresh_summary_view()
+        self.refresh_analytics_view()
 
     def refresh_log_table(self) -> None:
         """Populate the per-entry table."""
@@ -292,18 +313,18 @@ class WaterLogApp(App):
             )
 
     def refresh_rolling_table(self) -> None:
-        """Populate the rolling 24h table."""
+        """Populate the rolling window table."""
         self.rolling_table.clear(columns=True)
         self.rolling_table.add_columns(
             "timestamp",
             "oz",
-            "24h",
+            f"{self.window_hours}h",
             "% of target",
         )
 
         rows = self.fetch_rolling_rows()
         for row in rows:
-            # row = (timestamp, ounces, rolling_24h_ounces, weight, target, percent_of_target)
+            # row = (timestamp, ounces, rolling_ounces, weight, target, percent_of_target)
             self.rolling_table.add_row(
                 str(row[0]),
                 str(row[1]),
@@ -337,7 +358,7 @@ class WaterLogApp(App):
 
 
     def refresh_rolling_plot(self) -> None:
-        """Build a Plotext line chart of rolling_24h_ounces."""
+        """Build a Plotext chart of the rolling window's percent of target."""
         rows = self.fetch_rolling_rows()
         plt = self.rolling_plot.plt
 
@@ -349,21 +370,21 @@ class WaterLogApp(App):
                 break
 
         if not rows:
-            plt.title("Rolling 24h (no data)")
+            plt.title(f"Rolling {self.window_hours}h (no data)")
             return
 
         # Oldest on the left, newest on the right
         # rows = list(reversed(rows))
         # y = [float(r[2]) for r in rows]  # rolling_24h_ounces
-        y = [float(r[5]) for r in rows]  # rolling_24h_ounces
+        y = [float(r[5]) for r in rows]  # percent_of_target
         x = list(range(len(y)))
 
         # plt.plot(x, y)
         # plt.bar(x, y)  # Using bar plot for better visibility
         plt.bar(x, y, orientation="horizontal")
-        plt.title("Rolling 24h (oz)")
+        plt.title(f"Rolling {self.window_hours}h (% of target)")
         plt.xlabel("Entry (oldest → newest)")
-        plt.ylabel("24h total (oz)")
+        plt.ylabel(f"{self.window_hours}h % of target")
         # plt.grid(True, True)
 
     # def refresh_summary_view(self) -> None:
@@ -388,8 +409,8 @@ class WaterLogApp(App):
 
 
     def refresh_summary_view(self) -> None:
-        """Update the last-24-hours summary view."""
-        row = self.fetch_last_24h_summary()
+        """Update the summary card for the current rolling window."""
+        row = self.fetch_window_summary(self.window_hours)
 
         if not row:
             self.summary_view.update("No summary data available.")
@@ -403,17 +424,48 @@ class WaterLogApp(App):
         percent = 0.0 if percent is None else float(percent)
 
         text = (
-            f"Last 24 hours\n"
+            f"Last {self.window_hours} hours\n"
             f"  Total:  {total_oz:.1f} oz\n"
             f"  Target: {target_oz:.1f} oz  ({percent:.1f}% of target)\n"
             f"  Weight: {weight:.1f} lbs"
         )
 
         if total_oz <= 0:
-            text += "\n  No drinks logged in the last 24 hours."
+            text += f"\n  No drinks logged in the last {self.window_hours} hours."
 
         self.summary_view.update(text)
 
+    def refresh_analytics_view(self) -> None:
+        """Update the streaks / averages / hour-of-day histogram view."""
+        stats = self.fetch_analytics()
+
+        lines = [
+            f"Streak: {stats['current_streak']} days  (best {stats['best_streak']})",
+        ]
+
+        if stats["today_target"] is None:
+            lines.append(f"Today:  {stats['today_total']:.1f} oz")
+        else:
+            status = "met" if stats["today_met"] else "not met yet"
+            lines.append(
+                f"Today:  {stats['today_total']:.1f} / {stats['today_target']:.1f} oz  ({status})"
+            )
+
+        for window, average in stats["averages"].items():
+            if average is None:
+                lines.append(f"{window}-day avg: n/a")
+            else:
+                lines.append(f"{window}-day avg: {average:.1f} oz")
+
+        lines.append("")
+        lines.append("Hour of day (oz)")
+        peak = max(stats["hour_ounces"]) or 1.0
+        for hour, ounces in enumerate(stats["hour_ounces"]):
+            bar = "█" * round(ounces / peak * 20)
+            lines.append(f"  {hour:02d} {bar} {ounces:.0f}")
+
+        self.analytics_view.update("\n".join(lines))
+
 
 
     # --- View switching -------------------------------------------------
@@ -534,8 +586,7 @@ class WaterLogApp(App):
 
     def _show_view(self, index: int) -> None:
         """Show one of the five views based on index 0–4."""
-        # self.current_view = index % 5
-        self.current_view = index % 4
+        self.current_view = index % 5
 
         title_widget = self.query_one("#section-title", Static)
         rotate_button = self.query_one("#rotate-view-btn", Button)
@@ -547,12 +598,13 @@ class WaterLogApp(App):
             self.log_table.display = False
             self.full_table.display = False
             self.rolling_plot.display = False
+            self.analytics_view.display = False
             # self.summary_view.display = False
             self.summary_view.display = True
 
             delete_button.display = False  # hide here
 
-            title_widget.update("Rolling 24h")
+            title_widget.update(f"Rolling {self.window_hours}h")
             # rotate_button.label = "View: Latest Drinks"
             rotate_button.label = "next"
 
@@ -562,6 +614,7 @@ class WaterLogApp(App):
             self.log_table.display = True
             self.full_table.display = False
             self.rolling_plot.display = False
+            self.analytics_view.display = False
             self.summary_view.display = True
 
             delete_button.display = True  # show in this view
@@ -578,6 +631,7 @@ class WaterLogApp(App):
             self.log_table.display = False
             self.full_table.display = True
             self.rolling_plot.display = False
+            self.analytics_view.display = False
             self.summary_view.display = True
 
             delete_button.display = False
@@ -592,26 +646,27 @@ class WaterLogApp(App):
             self.log_table.display = False
             self.full_table.display = False
             self.rolling_plot.display = True
+            self.analytics_view.display = False
             self.summary_view.display = True
 
             delete_button.display = False
 
-            title_widget.update("Rolling 24h Chart")
+            title_widget.update(f"Rolling {self.window_hours}h Chart")
             # rotate_button.label = "View: 24h Summary"
             rotate_button.label = "next"
 
         else:
-            # Last 24 hours summary card
+            # Streaks, averages and hour-of-day histogram
             self.rolling_table.display = False
             self.log_table.display = False
             self.full_table.display = False
             self.rolling_plot.display = False
+            self.analytics_view.display = True
             self.summary_view.display = True
 
             delete_button.display = False
 
-            title_widget.update("Last 24 Hours Summary")
-            # rotate_button.label = "View: Rolling 24h"
+            title_widget.update("Analytics")
             rotate_button.label = "next"
 
 
@@ -646,12 +701,18 @@ class WaterLogApp(App):
             # Cycle: rolling table -> log -> full -> chart -> summary -> rolling
             self.action_next_view()
 
+        elif event.button.id == "window-btn":
+            self.action_next_window()
+
         elif event.button.id == "delete-row-btn":
             self.delete_selected_log_row()
 
 
 if __name__ == "__main__":
     db_path = sys.argv[1] if len(sys.argv) > 1 else "sqlite-water-tracker.db"
-    ensure_db(db_path)
-    app = WaterLogApp(db_path)
+    busy_timeout_ms = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUSY_TIMEOUT_MS
+    ensure_db(db_path, busy_timeout_ms)
+    app = WaterLogApp(db_path, busy_timeout_ms)
     app.run()
+    # Fold the WAL back into the main file so it doesn't linger between runs
+    checkpoint(db_path, busy_timeout_ms)
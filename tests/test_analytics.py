@@ -0,0 +1,132 @@
+# tests/test_analytics.py
+
+from datetime import date, timedelta
+
+from sqlite_water_tracker import analytics
+from sqlite_water_tracker.db import connect
+from sqlite_water_tracker.ensure_db import ensure_db
+
+TODAY = date(2026, 10, 19)
+
+
+def _db(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+    conn = connect(db_path)
+    # Target of 80 oz/day from well before any drinks
+    conn.execute("UPDATE user_weight SET timestamp = '2020-01-01 00:00:00', weight_lbs = 160")
+    conn.commit()
+    return db_path, conn
+
+
+def _drink(conn, timestamp: str, ounces: float) -> None:
+    conn.execute("INSERT INTO water_log (timestamp, ounces) VALUES (?, ?)", (timestamp, ounces))
+    conn.commit()
+
+
+def _rebuilt(conn, today: date = TODAY) -> dict:
+    conn.execute("DELETE FROM analytics_state")
+    conn.commit()
+    return analytics.update(conn, today=today)
+
+
+def test_streaks_and_averages(tmp_path):
+    _db_path, conn = _db(tmp_path)
+    for days_ago in (3, 2, 1):
+        day = TODAY - timedelta(days=days_ago)
+        _drink(conn, f"{day} 09:00:00", 80.0)
+    _drink(conn, f"{TODAY - timedelta(days=5)} 09:00:00", 40.0)
+
+    stats = analytics.update(conn, today=TODAY)
+
+    assert stats["current_streak"] == 3
+    assert stats["best_streak"] == 3
+    assert stats["averages"][7] == (3 * 80.0 + 40.0) / 5
+    assert stats["hour_drinks"][9] == 4
+    assert stats == _rebuilt(conn)
+
+
+def test_unchanged_update_does_not_write(tmp_path):
+    db_path, conn = _db(tmp_path)
+    _drink(conn, f"{TODAY} 09:00:00", 8.0)
+    analytics.update(conn, today=TODAY)
+
+    observer = connect(db_path, readonly=True)
+    try:
+        before = observer.execute("PRAGMA data_version").fetchone()[0]
+        analytics.update(conn, today=TODAY)
+        analytics.update(conn, today=TODAY)
+        after = observer.execute("PRAGMA data_version").fetchone()[0]
+    finally:
+        observer.close()
+
+    assert after == before
+
+
+def test_weight_edit_triggers_rebuild(tmp_path):
+    _db_path, conn = _db(tmp_path)
+    for days_ago in (2, 1):
+        day = TODAY - timedelta(days=days_ago)
+        _drink(conn, f"{day} 09:00:00", 80.0)
+    # Weight recorded after the drinks, so those days have no target yet
+    conn.execute("UPDATE user_weight SET timestamp = ?", (f"{TODAY} 08:00:00",))
+    conn.commit()
+    assert analytics.update(conn, today=TODAY)["best_streak"] == 0
+
+    # Back-date the weight: both days now meet the target
+    conn.execute("UPDATE user_weight SET timestamp = '2020-01-01 00:00:00'")
+    conn.commit()
+    stats = analytics.update(conn, today=TODAY)
+
+    assert stats["current_streak"] == 2
+    assert stats == _rebuilt(conn)
+
+
+def test_drink_edits_and_deletes_trigger_rebuild(tmp_path):
+    _db_path, conn = _db(tmp_path)
+    _drink(conn, f"{TODAY - timedelta(days=1)} 09:00:00", 8.0)
+    _drink(conn, f"{TODAY - timedelta(days=1)} 10:00:00", 8.0)
+    analytics.update(conn, today=TODAY)
+
+    conn.execute("UPDATE water_log SET ounces = 100 WHERE id = 1")
+    conn.commit()
+    stats = analytics.update(conn, today=TODAY)
+    assert stats["hour_ounces"][9] == 100.0
+    assert stats["current_streak"] == 1
+    assert stats == _rebuilt(conn)
+
+    conn.execute("DELETE FROM water_log WHERE id = 1")
+    conn.commit()
+    stats = analytics.update(conn, today=TODAY)
+    assert stats["hour_drinks"][9] == 0
+    assert stats["current_streak"] == 0
+    assert stats == _rebuilt(conn)
+
+
+def test_update_reads_one_snapshot(tmp_path, monkeypatch):
+    db_path, conn = _db(tmp_path)
+    _drink(conn, f"{TODAY} 09:00:00", 8.0)
+    analytics.update(conn, today=TODAY)
+
+    # Log a drink from another process between the histogram and rollup reads
+    next_day = analytics._next_day
+    writer = connect(db_path)
+
+    def next_day_with_insert(day):
+        _drink(writer, f"{TODAY} 10:00:00", 8.0)
+        monkeypatch.setattr(analytics, "_next_day", next_day)
+        return next_day(day)
+
+    monkeypatch.setattr(analytics, "_next_day", next_day_with_insert)
+    stats = analytics.update(conn, today=TODAY)
+    writer.close()
+
+    # Neither read saw the new drink...
+    assert stats["today_total"] == 8.0
+    assert sum(stats["hour_drinks"]) == 1
+
+    # ...and the next update counts it in both
+    stats = analytics.update(conn, today=TODAY)
+    assert stats["today_total"] == 16.0
+    assert sum(stats["hour_drinks"]) == 2
+    assert stats == _rebuilt(conn)
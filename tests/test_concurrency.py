@@ -0,0 +1,129 @@
+# tests/test_concurrency.py
+
+import multiprocessing as mp
+
+from sqlite_water_tracker.db import connect, run_write
+from sqlite_water_tracker.ensure_db import ensure_db
+
+WRITERS = 8
+INSERTS_PER_WRITER = 100
+
+
+def _writer(db_path: str, count: int) -> None:
+    for _ in range(count):
+        conn = connect(db_path)
+        try:
+            run_write(
+                conn,
+                """
+                INSERT INTO water_log (timestamp, ounces)
+                VALUES (datetime('now', 'localtime'), ?)
+                """,
+                (8.0,),
+            )
+        finally:
+            conn.close()
+
+
+def _reader(db_path: str, stop) -> None:
+    while not stop.is_set():
+        conn = connect(db_path)
+        try:
+            conn.execute("SELECT * FROM last_24_hours_summary").fetchall()
+        finally:
+            conn.close()
+
+
+def test_concurrent_writers_and_reader_lose_nothing(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+
+    stop = mp.Event()
+    reader = mp.Process(target=_reader, args=(db_path, stop))
+    writers = [
+        mp.Process(target=_writer, args=(db_path, INSERTS_PER_WRITER))
+        for _ in range(WRITERS)
+    ]
+
+    reader.start()
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(timeout=120)
+    stop.set()
+    reader.join(timeout=30)
+
+    assert [writer.exitcode for writer in writers] == [0] * WRITERS
+    assert reader.exitcode == 0
+
+    conn = connect(db_path)
+    try:
+        (count,) = conn.execute("SELECT COUNT(*) FROM water_log").fetchone()
+        (journal_mode,) = conn.execute("PRAGMA journal_mode").fetchone()
+    finally:
+        conn.close()
+
+    assert count == WRITERS * INSERTS_PER_WRITER
+    assert journal_mode == "wal"
+
+
+def _upgrader(db_path: str, stop) -> None:
+    """Re-run the schema upgrade over and over, as if an old app kept restarting."""
+    while not stop.is_set():
+        conn = connect(db_path)
+        try:
+            run_write(conn, "PRAGMA user_version = 0")
+        finally:
+            conn.close()
+        ensure_db(db_path)
+
+
+def _view_reader(db_path: str, stop) -> None:
+    while not stop.is_set():
+        conn = connect(db_path)
+        try:
+            conn.execute("SELECT * FROM water_log_full").fetchall()
+            conn.execute("SELECT * FROM rolling_log_full").fetchall()
+        finally:
+            conn.close()
+
+
+def test_schema_upgrade_races_writers_and_readers(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+
+    stop = mp.Event()
+    helpers = [
+        mp.Process(target=_upgrader, args=(db_path, stop)),
+        mp.Process(target=_view_reader, args=(db_path, stop)),
+    ]
+    writer = mp.Process(target=_writer, args=(db_path, INSERTS_PER_WRITER))
+
+    for process in helpers:
+        process.start()
+    writer.start()
+    writer.join(timeout=120)
+    stop.set()
+    for process in helpers:
+        process.join(timeout=30)
+
+    assert writer.exitcode == 0
+    assert [process.exitcode for process in helpers] == [0, 0]
+
+    conn = connect(db_path)
+    try:
+        mismatched = conn.execute(
+            """
+            SELECT COUNT(*)
+            FROM (
+                SELECT cumulative_ounces,
+                       SUM(ounces) OVER (ORDER BY timestamp, id) AS expected
+                FROM water_log
+            )
+            WHERE cumulative_ounces != expected
+            """
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+    assert mismatched == 0
@@ -0,0 +1,174 @@
+# tests/test_rolling.py
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from sqlite_water_tracker.db import connect, rolling
+from sqlite_water_tracker.ensure_db import ensure_db, SCHEMA_VERSION
+
+# The two tables as they were before cumulative_ounces existed
+BASELINE_SCHEMA = """
+CREATE TABLE water_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    ounces REAL NOT NULL
+);
+
+CREATE TABLE user_weight (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    weight_lbs REAL NOT NULL
+);
+
+CREATE VIEW water_log_daily AS
+SELECT SUBSTR(timestamp, 1, 10) AS date, SUM(ounces) AS total
+FROM water_log
+GROUP BY date;
+"""
+
+
+def _db(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+    return connect(db_path)
+
+
+def _assert_cumulative(conn) -> None:
+    rows = conn.execute(
+        """
+        SELECT id, cumulative_ounces,
+               SUM(ounces) OVER (ORDER BY timestamp, id) AS expected
+        FROM water_log
+        """
+    ).fetchall()
+    for row_id, cumulative, expected in rows:
+        assert cumulative == pytest.approx(expected), f"row {row_id}"
+
+
+def _stamp(hours: float) -> str:
+    return (datetime(2026, 10, 19) + timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_triggers_keep_running_total(tmp_path):
+    conn = _db(tmp_path)
+    rng = random.Random(29)
+
+    # Appends, then inserts back-dated before and tied with existing rows
+    for hours in (1, 2, 3, 5, 8):
+        conn.execute("INSERT INTO water_log (timestamp, ounces) VALUES (?, 8)", (_stamp(hours),))
+        _assert_cumulative(conn)
+    for hours, ounces in ((0, 4), (2, 6), (4, 10), (2, 1)):
+        conn.execute("INSERT INTO water_log (timestamp, ounces) VALUES (?, ?)", (_stamp(hours), ounces))
+        _assert_cumulative(conn)
+
+    # Deletes at the start, middle and end
+    for order in ("timestamp, id", "timestamp DESC, id DESC"):
+        conn.execute(f"DELETE FROM water_log WHERE id = (SELECT id FROM water_log ORDER BY {order} LIMIT 1)")
+        _assert_cumulative(conn)
+    conn.execute("DELETE FROM water_log WHERE timestamp = ?", (_stamp(2),))
+    _assert_cumulative(conn)
+
+    # Edits: ounces only, timestamp moved earlier and later, both at once
+    ids = [row[0] for row in conn.execute("SELECT id FROM water_log ORDER BY timestamp, id")]
+    conn.execute("UPDATE water_log SET ounces = 20 WHERE id = ?", (ids[1],))
+    _assert_cumulative(conn)
+    conn.execute("UPDATE water_log SET timestamp = ? WHERE id = ?", (_stamp(-3), ids[-1]))
+    _assert_cumulative(conn)
+    conn.execute("UPDATE water_log SET timestamp = ? WHERE id = ?", (_stamp(12), ids[0]))
+    _assert_cumulative(conn)
+    conn.execute("UPDATE water_log SET timestamp = ?, ounces = 3 WHERE id = ?", (_stamp(4), ids[2]))
+    _assert_cumulative(conn)
+
+    # A random mix, with few distinct timestamps so ties are common
+    for _ in range(200):
+        action = rng.choice(("insert", "delete", "update"))
+        row = conn.execute("SELECT id FROM water_log ORDER BY RANDOM() LIMIT 1").fetchone()
+        if action == "insert" or row is None:
+            conn.execute(
+                "INSERT INTO water_log (timestamp, ounces) VALUES (?, ?)",
+                (_stamp(rng.randint(0, 10)), rng.randint(1, 30)),
+            )
+        elif action == "delete":
+            conn.execute("DELETE FROM water_log WHERE id = ?", row)
+        else:
+            conn.execute(
+                "UPDATE water_log SET timestamp = ?, ounces = ? WHERE id = ?",
+                (_stamp(rng.randint(0, 10)), rng.randint(1, 30), row[0]),
+            )
+        _assert_cumulative(conn)
+
+    conn.close()
+
+
+@pytest.mark.parametrize("hours", [1, 3, 6, 24])
+def test_rolling_matches_brute_force(tmp_path, hours):
+    conn = _db(tmp_path)
+    drinks = [
+        (_stamp(0), 8.0),
+        (_stamp(3), 4.0),
+        (_stamp(6), 6.0),
+        (_stamp(6), 2.0),  # same timestamp as the previous drink
+        (_stamp(7), 5.0),  # exactly 1 hour after the tie
+        (_stamp(9), 3.0),  # exactly 3 hours after the tie, 6 after 03:00
+        (_stamp(30), 7.0),  # exactly 24 hours after 06:00
+    ]
+    conn.executemany("INSERT INTO water_log (timestamp, ounces) VALUES (?, ?)", drinks)
+    conn.commit()
+
+    # Window is (T - hours, T]: a drink exactly at T - hours is already outside it
+    expected = []
+    for stamp, ounces in drinks:
+        end = datetime.fromisoformat(stamp)
+        start = end - timedelta(hours=hours)
+        total = sum(
+            o for s, o in drinks if start < datetime.fromisoformat(s) <= end
+        )
+        expected.append((stamp, ounces, total))
+
+    rows = rolling(conn, hours=hours, limit=len(drinks))
+    conn.close()
+
+    # rolling() is newest first, ties by id descending
+    expected = list(reversed(expected))
+    assert [(row[0], row[1], row[2]) for row in rows] == expected
+
+
+def test_migration_backfills_baseline_db(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BASELINE_SCHEMA)
+    # Inserted out of timestamp order, with a tie
+    conn.executemany(
+        "INSERT INTO water_log (timestamp, ounces) VALUES (?, ?)",
+        [(_stamp(5), 8.0), (_stamp(1), 4.0), (_stamp(3), 6.0), (_stamp(3), 2.0), (_stamp(0), 1.0)],
+    )
+    conn.execute("INSERT INTO user_weight (timestamp, weight_lbs) VALUES (?, 150)", (_stamp(-24),))
+    conn.commit()
+    conn.close()
+
+    ensure_db(db_path)
+
+    conn = connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM user_weight").fetchone()[0] == 1
+    assert [row[0] for row in conn.execute("SELECT cumulative_ounces FROM water_log ORDER BY id")] == [
+        21.0, 5.0, 11.0, 13.0, 1.0
+    ]
+    _assert_cumulative(conn)
+
+    # The triggers are in place after the upgrade
+    conn.execute("INSERT INTO water_log (timestamp, ounces) VALUES (?, 10)", (_stamp(2),))
+    conn.commit()
+    _assert_cumulative(conn)
+    assert conn.execute("SELECT date, total FROM water_log_full").fetchall() == [
+        ("2026-10-19", 31.0)
+    ]
+
+    # Running it again leaves everything as it was
+    before = conn.execute("SELECT * FROM water_log ORDER BY id").fetchall()
+    ensure_db(db_path)
+    assert conn.execute("SELECT * FROM water_log ORDER BY id").fetchall() == before
+    conn.close()
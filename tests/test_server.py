@@ -0,0 +1,164 @@
+# tests/test_server.py
+
+import asyncio
+import json
+
+from sqlite_water_tracker import server
+from sqlite_water_tracker.db import connect, run_write
+from sqlite_water_tracker.ensure_db import ensure_db
+from sqlite_water_tracker.server import WaterServer
+
+
+async def _get(port: int, path: str, etag: str | None = None):
+    """Send a GET and return (status, headers, body)."""
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n"
+    if etag is not None:
+        request += f"If-None-Match: {etag}\r\n"
+    return await _send(port, (request + "\r\n").encode("latin-1"))
+
+
+async def _send(port: int, raw: bytes):
+    """Send raw bytes, read until the server closes, return (status, headers, body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return int(status_line.split()[1]), headers, body
+
+
+def _run(db_path: str, scenario) -> None:
+    async def main():
+        app = WaterServer(db_path)
+        server = await app.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            await scenario(port)
+        finally:
+            server.close()
+            await server.wait_closed()
+            app.close()
+
+    asyncio.run(main())
+
+
+def _insert_drink(db_path: str, ounces: float = 8.0) -> None:
+    conn = connect(db_path)
+    try:
+        run_write(
+            conn,
+            """
+            INSERT INTO water_log (timestamp, ounces)
+            VALUES (datetime('now', 'localtime'), ?)
+            """,
+            (ounces,),
+        )
+    finally:
+        conn.close()
+
+
+def test_etag_304_and_invalidation(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+
+    async def scenario(port):
+        for path in ("/summary", "/daily", "/rolling"):
+            status, headers, _body = await _get(port, path)
+            assert status == 200
+            etag = headers["etag"]
+
+            status, headers, body = await _get(port, path, etag)
+            assert status == 304
+            assert headers["etag"] == etag
+            assert body == b""
+
+        status, headers, _body = await _get(port, "/daily")
+        old_etag = headers["etag"]
+
+        # A commit from another connection changes the ETag
+        _insert_drink(db_path)
+
+        status, headers, body = await _get(port, "/daily", old_etag)
+        assert status == 200
+        assert headers["etag"] != old_etag
+        rows = json.loads(body)
+        assert len(rows) == 1
+        assert rows[0]["total"] == 8.0
+
+    _run(db_path, scenario)
+
+
+def test_errors(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+
+    async def scenario(port):
+        status, _headers, _body = await _get(port, "/nope")
+        assert status == 404
+
+        status, _headers, _body = await _get(port, "/daily?limit=x")
+        assert status == 400
+
+        status, _headers, _body = await _get(port, "/rolling?hours=0")
+        assert status == 400
+
+        # Request line longer than the StreamReader limit
+        status, _headers, _body = await _send(port, b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n")
+        assert status == 400
+
+        # A database error becomes a 500 instead of a dropped connection
+        conn = connect(db_path)
+        conn.execute("DROP VIEW water_log_full")
+        conn.commit()
+        conn.close()
+        status, _headers, _body = await _get(port, "/daily")
+        assert status == 500
+
+    _run(db_path, scenario)
+
+
+def test_silent_client_times_out(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+    monkeypatch.setattr(server, "REQUEST_TIMEOUT_S", 0.2)
+
+    async def scenario(port):
+        status, _headers, _body = await _send(port, b"GET /summary HTTP/1.1\r\n")
+        assert status == 408
+
+    _run(db_path, scenario)
+
+
+def test_window_hours(tmp_path):
+    db_path = str(tmp_path / "water.db")
+    ensure_db(db_path)
+    conn = connect(db_path)
+    conn.execute(
+        "INSERT INTO water_log (timestamp, ounces) VALUES (datetime('now', 'localtime', '-10 hours'), 4)"
+    )
+    conn.commit()
+    conn.close()
+    _insert_drink(db_path)
+
+    async def scenario(port):
+        _status, _headers, body = await _get(port, "/summary?hours=6")
+        assert json.loads(body)["total_ounces"] == 8.0
+
+        _status, _headers, body = await _get(port, "/summary")
+        summary = json.loads(body)
+        assert summary["hours"] == 24
+        assert summary["total_ounces"] == 12.0
+
+        _status, _headers, body = await _get(port, "/rolling?hours=6&limit=1")
+        rows = json.loads(body)
+        assert [row["rolling_ounces"] for row in rows] == [8.0]
+
+    _run(db_path, scenario)